@@ -2,11 +2,23 @@ import os
 from dotenv import load_dotenv
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.types import CallToolResult, TextContent
 from google import genai
+from google.genai import types
 import asyncio
+import ast
+import operator
+from collections import deque
 from rich.console import Console
 from rich.panel import Panel
-import json
+import orjson
+import hashlib
+import functools
+import importlib.util
+import httpx
+import shelve
+import time
+from types import SimpleNamespace
 from typing import Tuple, Optional, Dict, Any
 
 console = Console()
@@ -14,23 +26,219 @@ console = Console()
 # Load environment variables and setup Gemini
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=api_key)
+# Every aio call shares one pooled httpx.AsyncClient; HTTP/2 multiplexes when h2 is installed
+client = genai.Client(
+    api_key=api_key,
+    http_options=types.HttpOptions(
+        timeout=10_000,
+        async_client_args={
+            "http2": importlib.util.find_spec("h2") is not None,
+            "limits": httpx.Limits(max_keepalive_connections=16, keepalive_expiry=30.0)
+        }
+    )
+)
 
-async def generate_with_timeout(client, prompt, timeout=10):
-    """Generate content with a timeout"""
+MODEL = "gemini-2.0-flash"
+
+# Exact-match prompt cache: in-memory, backed by a shelf so re-runs skip the LLM.
+# Set COT_NO_PROMPT_CACHE=1 to bypass it; persisted entries expire after the TTL.
+PROMPT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "cot_main", "prompts.db")
+PROMPT_CACHE_TTL = 7 * 24 * 3600
+PROMPT_CACHE_DISABLED = os.getenv("COT_NO_PROMPT_CACHE") == "1"
+_PROMPT_CACHE: Dict[str, str] = {}
+_prompt_shelf = None
+
+def _prompt_key(prompt: str, prefix: str = "") -> str:
+    """Hash the (model, cached prefix, prompt) triple into a cache key"""
+    return hashlib.blake2b(f"{MODEL}\0{prefix}\0{prompt}".encode()).hexdigest()
+
+def open_prompt_cache() -> None:
+    """Open the persistent prompt cache once for the whole run"""
+    global _prompt_shelf
+    if PROMPT_CACHE_DISABLED or _prompt_shelf is not None:
+        return
+    try:
+        os.makedirs(os.path.dirname(PROMPT_CACHE_PATH), exist_ok=True)
+        _prompt_shelf = shelve.open(PROMPT_CACHE_PATH)
+    except Exception as e:
+        console.print(f"[yellow]Prompt cache not persisted: {e}[/yellow]")
+
+def close_prompt_cache() -> None:
+    """Flush and close the persistent prompt cache"""
+    global _prompt_shelf
+    if _prompt_shelf is not None:
+        _prompt_shelf.close()
+        _prompt_shelf = None
+
+def _cache_lookup(key: str) -> Optional[str]:
+    """Return the cached response text for a key, checking memory then disk"""
+    if PROMPT_CACHE_DISABLED:
+        return None
+    if key in _PROMPT_CACHE:
+        return _PROMPT_CACHE[key]
+    if _prompt_shelf is None:
+        return None
+    entry = _prompt_shelf.get(key)
+    if not isinstance(entry, tuple) or time.time() - entry[0] > PROMPT_CACHE_TTL:
+        return None
+    _PROMPT_CACHE[key] = entry[1]
+    return entry[1]
+
+def _cache_store(key: str, text: str, persist: bool = True) -> None:
+    """Store response text in memory and, if persist is set, on disk"""
+    if PROMPT_CACHE_DISABLED:
+        return
+    _PROMPT_CACHE[key] = text
+    if persist and _prompt_shelf is not None:
+        _prompt_shelf[key] = (time.time(), text)
+
+async def warm_up(client) -> None:
+    """
+    Prime the Gemini connection so the first real turn doesn't pay for
+    connection setup. Uses a model metadata lookup, which bills no tokens.
+    """
     try:
-        loop = asyncio.get_event_loop()
-        response = await asyncio.wait_for(
-            loop.run_in_executor(
-                None, 
-                lambda: client.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=prompt
-                )
+        await client.aio.models.get(model=MODEL)
+    except Exception as e:
+        console.print(f"[yellow]Warm-up skipped: {e}[/yellow]")
+
+# Gemini rejects explicit caches smaller than this many tokens
+MIN_CACHE_TOKENS = 4096
+
+async def create_prompt_cache(client, system_prompt: str, ttl: str = "600s"):
+    """
+    Register the system prompt with Gemini's server-side context cache.
+    Returns the cached content, or None if caching is unavailable (e.g. the
+    prompt is below the model's minimum cacheable token count).
+    """
+    encoded = system_prompt.encode()
+    # Every token covers at least one byte, so a shorter prompt can't qualify; skip the round trip
+    if len(encoded) < MIN_CACHE_TOKENS:
+        return None
+    display_name = "cot-" + hashlib.blake2b(encoded, digest_size=8).hexdigest()
+    try:
+        counted = await client.aio.models.count_tokens(model=MODEL, contents=system_prompt)
+        if (counted.total_tokens or 0) < MIN_CACHE_TOKENS:
+            return None
+        return await client.aio.caches.create(
+            model=MODEL,
+            config=types.CreateCachedContentConfig(
+                display_name=display_name,
+                contents=[system_prompt],
+                ttl=ttl
+            )
+        )
+    except Exception as e:
+        console.print(f"[yellow]Prompt caching unavailable, sending full prompt: {e}[/yellow]")
+        return None
+
+async def delete_prompt_cache(client, cached_content) -> None:
+    """Delete a cache created by create_prompt_cache so it stops being billed"""
+    if not cached_content:
+        return
+    try:
+        await client.aio.caches.delete(name=cached_content.name)
+    except Exception as e:
+        console.print(f"[yellow]Prompt cache not deleted: {e}[/yellow]")
+
+# Structured output for a turn that also self-checks the previous calculation
+FUSED_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "next_action": {"type": "STRING"},
+        "self_check": {"type": "STRING"}
+    },
+    "required": ["next_action", "self_check"]
+}
+FUSED_INSTRUCTION = (
+    "Respond with a JSON object: "
+    '{"next_action": "<your ONE-line response>", '
+    '"self_check": "YES if the result is reasonable, otherwise explain why not"}'
+)
+
+DIRECTIVES = ("FUNCTION_CALL:", "FINAL_ANSWER:")
+
+def _complete_directive(text: str) -> Optional[str]:
+    """
+    Return the directive once a newline-terminated prefix of the buffer parses
+    as one (a FINAL_ANSWER line, or a FUNCTION_CALL whose JSON may span
+    several lines), else None
+    """
+    text = text.lstrip()
+    if not text.startswith(DIRECTIVES):
+        return None
+    end = text.find("\n")
+    while end != -1:
+        candidate = text[:end].rstrip()
+        if candidate.startswith("FINAL_ANSWER:"):
+            return candidate
+        # Unmemoized, so partial candidates don't crowd validate_json's cache
+        if _validate_json(candidate)[0] or parse_pipe_call(candidate):
+            return candidate
+        end = text.find("\n", end + 1)
+    return None
+
+async def _stream_content(client, prompt, config, stop_early: bool) -> str:
+    """
+    Stream a response into a buffer. With stop_early, the stream is closed
+    as soon as the directive is complete, discarding the remaining tokens.
+    """
+    stream = await client.aio.models.generate_content_stream(
+        model=MODEL,
+        contents=prompt,
+        config=config
+    )
+    chunks = []
+    try:
+        async for chunk in stream:
+            text = chunk.text or ""
+            chunks.append(text)
+            if stop_early and "\n" in text:
+                directive = _complete_directive("".join(chunks))
+                if directive:
+                    return directive
+    finally:
+        await stream.aclose()
+    return "".join(chunks)
+
+async def generate_with_timeout(client, prompt, timeout=10, cached_content=None, response_schema=None):
+    """
+    Generate content with a timeout, serving repeated prompts from the cache.
+    If cached_content is given, prompt holds only the conversation that
+    follows the cached system prompt. If response_schema is given, the
+    response is constrained to JSON matching it; otherwise the response is
+    streamed and returned as soon as its directive is complete.
+    """
+    config = {}
+    prefix = ""
+    if cached_content:
+        config["cached_content"] = cached_content.name
+        prefix = cached_content.display_name
+    if response_schema:
+        config["response_mime_type"] = "application/json"
+        config["response_schema"] = response_schema
+        prefix += "\0json"
+
+    key = _prompt_key(prompt, prefix)
+    cached = _cache_lookup(key)
+    if cached is not None:
+        return SimpleNamespace(text=cached)
+
+    try:
+        text = await asyncio.wait_for(
+            _stream_content(
+                client,
+                prompt,
+                types.GenerateContentConfig(**config) if config else None,
+                stop_early=not response_schema
             ),
             timeout=timeout
         )
-        return response
+        if text:
+            # Only well-formed directives outlive the run; anything else could replay a bad turn
+            next_action, _ = parse_fused_response(text.strip())
+            _cache_store(key, text, persist=next_action.startswith(DIRECTIVES))
+        return SimpleNamespace(text=text)
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
         return None
@@ -42,7 +250,15 @@ async def get_llm_response(client, prompt):
         return response.text.strip()
     return None
 
+@functools.lru_cache(maxsize=256)
 def validate_json(function_call: str) -> Tuple[bool, Optional[Dict[str, Any]], str]:
+    """
+    Memoized _validate_json, so identical retries skip re-parsing; callers
+    must not mutate the returned dict.
+    """
+    return _validate_json(function_call)
+
+def _validate_json(function_call: str) -> Tuple[bool, Optional[Dict[str, Any]], str]:
     """
     Validates the JSON structure in a function call string.
     
@@ -63,7 +279,7 @@ def validate_json(function_call: str) -> Tuple[bool, Optional[Dict[str, Any]], s
         json_str = function_call.replace("FUNCTION_CALL: ", "", 1)
         
         # Parse JSON
-        parsed_json = json.loads(json_str)
+        parsed_json = orjson.loads(json_str)
         
         # Validate required fields
         if not isinstance(parsed_json, dict):
@@ -83,11 +299,113 @@ def validate_json(function_call: str) -> Tuple[bool, Optional[Dict[str, Any]], s
             
         return True, parsed_json, "Validation successful"
         
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         return False, None, f"Invalid JSON format: {str(e)}"
     except Exception as e:
         return False, None, f"Validation error: {str(e)}"
 
+def parse_pipe_call(function_call: str) -> Optional[Dict[str, Any]]:
+    """
+    Parses the pipe-delimited form shown in the prompt example, e.g.
+    'FUNCTION_CALL: show_reasoning|[...]' or 'FUNCTION_CALL: verify|2 + 3|5'.
+    
+    Returns:
+        Optional[Dict]: The same {"name", "args"} shape validate_json produces,
+        or None if the call isn't in pipe form
+    """
+    _, _, function_info = function_call.partition("FUNCTION_CALL:")
+    func_name, sep, rest = function_info.lstrip().partition("|")
+    if not sep:
+        return None
+    func_name = func_name.rstrip()
+
+    if func_name == "show_reasoning":
+        args = {"steps": rest.strip()}
+    elif func_name == "calculate":
+        args = {"expression": rest.strip()}
+    elif func_name == "verify":
+        expression, _, expected = rest.partition("|")
+        args = {"expression": expression.strip(), "expected": expected.strip()}
+    elif func_name == "fallback_reasoning":
+        args = {"step_description": rest.strip()}
+    else:
+        return None
+    return {"name": func_name, "args": args}
+
+def parse_final_answer(result: str) -> float:
+    """Extract the number from 'FINAL_ANSWER: [answer]'"""
+    _, _, rest = result.partition("[")
+    answer, _, _ = rest.partition("]")
+    return float(answer)
+
+# Client-side memo for tools whose result depends only on their arguments.
+# Entries hold the result and, for locally answered verifies, the actual value.
+DETERMINISTIC_TOOLS = {"calculate", "verify"}
+_TOOL_CACHE: Dict[Tuple, Tuple[CallToolResult, Optional[float]]] = {}
+
+def _print_local_verify(args: Dict[str, Any], result: CallToolResult, actual: Optional[float]) -> None:
+    """Show a verify verdict answered on the client, mirroring the tool server's output"""
+    expression, expected = args["expression"], args["expected"]
+    if result.content[0].text == "True":
+        console.print(f"[green]✓ Correct! {expression} = {expected}[/green] [dim](cached)[/dim]")
+    elif actual is not None:
+        console.print(f"[red]✗ Incorrect! {expression} should be {actual}, got {expected}[/red] [dim](cached)[/dim]")
+    else:
+        console.print(f"[red]✗ Incorrect! {expression} != {expected}[/red] [dim](cached)[/dim]")
+
+async def cached_call_tool(session, name: str, args: Dict[str, Any]) -> CallToolResult:
+    """
+    Call a tool, memoizing deterministic ones (calculate, verify).
+    A verify whose expression has already been calculated is answered
+    locally without a round trip to the tool server. Results reporting an
+    error (including calculate's in-band "Error: ..." text) are not cached.
+    """
+    if name not in DETERMINISTIC_TOOLS:
+        return await session.call_tool(name, arguments=args)
+
+    key = (name, tuple(sorted(args.items())))
+    if key in _TOOL_CACHE:
+        result, actual = _TOOL_CACHE[key]
+        if name == "verify":
+            _print_local_verify(args, result, actual)
+        return result
+
+    if name == "verify":
+        calculated = _TOOL_CACHE.get(("calculate", (("expression", args["expression"]),)))
+        try:
+            actual = float(calculated[0].content[0].text)
+            is_correct = abs(actual - float(args["expected"])) < 1e-10
+            result = CallToolResult(content=[TextContent(type="text", text=str(is_correct))])
+            _TOOL_CACHE[key] = (result, actual)
+            _print_local_verify(args, result, actual)
+            return result
+        except (TypeError, IndexError, ValueError):
+            pass
+
+    result = await session.call_tool(name, arguments=args)
+    failed = result.isError or any(
+        getattr(item, "text", "").startswith("Error") for item in result.content
+    )
+    if not failed:
+        _TOOL_CACHE[key] = (result, None)
+    return result
+
+def parse_steps(steps) -> list:
+    """
+    Normalize show_reasoning steps into a list.
+    Models sometimes send the list as a string; it is parsed as JSON first,
+    then as a Python literal. LLM text is never passed to eval.
+    """
+    if not isinstance(steps, str):
+        return steps
+    try:
+        parsed = orjson.loads(steps)
+    except orjson.JSONDecodeError:
+        parsed = ast.literal_eval(steps.strip())
+    if not isinstance(parsed, list):
+        raise ValueError("Invalid steps: must be a list")
+    return parsed
+
 async def handle_tool_error(session, error_msg: str, step_context: str) -> str:
     """
     Handle tool errors by calling fallback_reasoning
@@ -97,18 +415,114 @@ async def handle_tool_error(session, error_msg: str, step_context: str) -> str:
     await session.call_tool("fallback_reasoning", arguments={"step_description": fallback_description})
     return f"\nUser: Error occurred. Fallback triggered. Please reconsider this step or try an alternative approach."
 
+# Operators a self-check can be answered for locally
+_CHEAP_BINOPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_CHEAP_UNARYOPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+# Magnitude bound for constants and intermediate results; larger values go to the LLM
+CHEAP_VERIFY_LIMIT = 1e12
+
+def _bounded(result) -> float:
+    """Reject values outside the magnitude cheap_verify handles"""
+    if not abs(result) <= CHEAP_VERIFY_LIMIT:
+        raise ValueError(f"Value out of range: {result}")
+    return result
+
+def _cheap_eval(node) -> float:
+    """Evaluate a numeric-only +-*/ expression tree, rejecting anything else"""
+    if isinstance(node, ast.Expression):
+        return _cheap_eval(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return _bounded(node.value)
+    if isinstance(node, ast.BinOp) and type(node.op) in _CHEAP_BINOPS:
+        return _bounded(_CHEAP_BINOPS[type(node.op)](_cheap_eval(node.left), _cheap_eval(node.right)))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _CHEAP_UNARYOPS:
+        return _bounded(_CHEAP_UNARYOPS[type(node.op)](_cheap_eval(node.operand)))
+    raise ValueError(f"Unsupported expression node: {type(node).__name__}")
+
+def cheap_verify(expression: str, value) -> bool:
+    """
+    Check a calculation locally when the expression is pure arithmetic.
+    Returns False for anything else (functions, names, **, values beyond
+    CHEAP_VERIFY_LIMIT, etc.) so the LLM self-check still runs for those.
+    """
+    try:
+        expected = _cheap_eval(ast.parse(expression, mode="eval"))
+        return abs(expected - float(value)) < 1e-9
+    except (SyntaxError, ValueError, TypeError, ArithmeticError, RecursionError):
+        return False
+
+def parse_fused_response(text: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a fused JSON response into the next action and the self-check verdict
+    Returns the text unchanged and None if it isn't a fused response
+    """
+    try:
+        parsed = orjson.loads(text)
+        return parsed["next_action"].strip(), parsed["self_check"]
+    except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+        return text, None
+
+def start_self_check(client, expression: str, value: str):
+    """Run a standalone LLM self-check in the background"""
+    self_check_prompt = f"""Given the calculation:
+    Expression: {expression}
+    Result: {value}
+    
+    Is the result reasonable?
+
+    Respond with ONLY 'YES' if all checks pass, or explain why they don't pass.
+    """
+    return (
+        asyncio.create_task(get_llm_response(client, self_check_prompt)),
+        expression,
+        value
+    )
+
+async def resolve_self_check(session, pending) -> str:
+    """
+    Settle a self-check (a background task or an already-known verdict) and
+    trigger fallback if it raised concerns
+    Returns the fallback message for the conversation, if any
+    """
+    if not pending:
+        return ""
+    check, expression, value = pending
+    try:
+        self_check_response = await check if asyncio.isfuture(check) else check
+        if not self_check_response:
+            return await handle_tool_error(
+                session,
+                "Self-check failed to respond",
+                f"self-check for calculation: {expression} = {value}"
+            )
+        if self_check_response.strip() != "YES":
+            await session.call_tool("fallback_reasoning", arguments={
+                "step_description": f"Self-check concerns: {self_check_response}"
+            })
+    except Exception as e:
+        return await handle_tool_error(
+            session,
+            str(e),
+            f"self-check for calculation: {expression}"
+        )
+    return ""
+
 async def main():
     try:
         console.print(Panel("Chain of Thought Calculator", border_style="cyan"))
+        open_prompt_cache()
 
         server_params = StdioServerParameters(
             command="python",
             args=["cot_tools.py"]
         )
 
+        # Warm up in the background while the tool server is spawned
+        warmup_task = asyncio.create_task(warm_up(client))
+
         async with stdio_client(server_params) as (read, write):
             async with ClientSession(read, write) as session:
-                await session.initialize()
+                await asyncio.gather(session.initialize(), warmup_task)
 
                 system_prompt = """You are a mathematical reasoning agent that solves problems step by step, tags the reasoning type, performs internal self-checks, and uses tools when appropriate.
                 You have access to these tools:
@@ -149,153 +563,184 @@ async def main():
 
                 console.print(Panel(f"Problem: {problem}", border_style="cyan"))
 
-                # Initialize conversation
-                prompt = f"{system_prompt}\n\nSolve this problem step by step: {problem}"
-                conversation_history = []
+                # Register the static system prompt once; each turn then sends only the conversation
+                prompt_cache = await create_prompt_cache(client, system_prompt)
 
-                while True:
-                    response = await generate_with_timeout(client, prompt)
-                    if not response or not response.text:
-                        break
+                try:
+                    # Initialize conversation; turns are joined only when a prompt is sent
+                    turns = deque([f"Solve this problem step by step: {problem}"])
+                    if not prompt_cache:
+                        turns.appendleft(f"{system_prompt}\n\n")
+                    conversation_history = []
+                    pending_self_check = None
+                    fused_check = None
+                    last_hash = None
 
-                    result = response.text.strip()
-                    console.print(f"\n[yellow]Assistant:[/yellow] {result}")
+                    while True:
+                        response = await generate_with_timeout(
+                            client,
+                            "".join(turns),
+                            cached_content=prompt_cache,
+                            response_schema=FUSED_SCHEMA if fused_check else None
+                        )
+                        if not response or not response.text:
+                            break
 
-                    if result.startswith("FUNCTION_CALL:"):
-                        # Validate JSON first
-                        is_valid, parsed_json, validation_message = validate_json(result)
+                        result = response.text.strip()
+
+                        # A turn following a calculation carries its self-check verdict
+                        if fused_check:
+                            expression, value = fused_check
+                            fused_check = None
+                            result, self_check_response = parse_fused_response(result)
+                            if self_check_response is None:
+                                pending_self_check = start_self_check(client, expression, value)
+                            else:
+                                pending_self_check = (self_check_response, expression, value)
+                        elif result.startswith("{"):
+                            # Unrequested fused object; the step was already checked locally
+                            result, _ = parse_fused_response(result)
+
+                        console.print(f"\n[yellow]Assistant:[/yellow] {result}")
+
+                        # An identical response to the previous one means the model is stuck
+                        result_hash = hash(result)
+                        if result_hash == last_hash:
+                            await session.call_tool("fallback_reasoning", arguments={
+                                "step_description": "LLM stuck in identical-response loop"
+                            })
+                            break
+                        last_hash = result_hash
+
+                        if result.startswith("FUNCTION_CALL:"):
+                            # Validate JSON first
+                            is_valid, parsed_json, validation_message = validate_json(result)
+                            if not parsed_json:
+                                parsed_json = parse_pipe_call(result)
                         
-                        try:
-                            if parsed_json:
-                                func_name = parsed_json["name"]
-                                args = parsed_json["args"]
+                            try:
+                                if parsed_json:
+                                    func_name = parsed_json["name"]
+                                    args = parsed_json["args"]
                                 
-                                if func_name == "show_reasoning":
-                                    try:
-                                        steps = args.get("steps", [])
-                                        await session.call_tool("show_reasoning", arguments={"steps": steps})
-                                        prompt += f"\nUser: Next step?"
-                                    except Exception as e:
-                                        prompt += await handle_tool_error(
-                                            session, 
-                                            str(e), 
-                                            f"show_reasoning with steps: {steps}"
-                                        )
+                                    if func_name == "show_reasoning":
+                                        raw_steps = args.get("steps", [])
+                                        try:
+                                            steps = parse_steps(raw_steps)
+                                            await session.call_tool("show_reasoning", arguments={"steps": steps})
+                                            turns.append(f"\nUser: Next step?")
+                                        except Exception as e:
+                                            turns.append(await handle_tool_error(
+                                                session, 
+                                                str(e), 
+                                                f"show_reasoning with steps: {raw_steps}"
+                                            ))
                                         
-                                elif func_name == "calculate":
-                                    try:
-                                        expression = args.get("expression", "")
-                                        calc_result = await session.call_tool("calculate", arguments={"expression": expression})
+                                    elif func_name == "calculate":
+                                        try:
+                                            expression = args.get("expression", "")
+                                            calc_result = await cached_call_tool(session, "calculate", {"expression": expression})
                                         
-                                        if calc_result.content:
-                                            value = calc_result.content[0].text
-                                            
-                                            # Self-check with fallback
-                                            try:
-                                                self_check_prompt = f"""Given the calculation:
-                                                Expression: {expression}
-                                                Result: {value}
-                                                
-                                                Is the result reasonable?
-
-                                                Respond with ONLY 'YES' if all checks pass, or explain why they don't pass.
-                                                """
-                                                
-                                                self_check_response = await get_llm_response(client, self_check_prompt)
-                                                
-                                                if not self_check_response:
-                                                    prompt += await handle_tool_error(
-                                                        session,
-                                                        "Self-check failed to respond",
-                                                        f"self-check for calculation: {expression} = {value}"
-                                                    )
-                                                elif self_check_response.strip() != "YES":
-                                                    # Call fallback but continue with verification
-                                                    await session.call_tool("fallback_reasoning", arguments={
-                                                        "step_description": f"Self-check concerns: {self_check_response}"
-                                                    })
-                                            
-                                            except Exception as e:
-                                                prompt += await handle_tool_error(
+                                            if calc_result.content:
+                                                value = calc_result.content[0].text
+
+                                                # Settle any self-check the model skipped verifying
+                                                pending, pending_self_check = pending_self_check, None
+                                                turns.append(await resolve_self_check(session, pending))
+
+                                                # Raises for in-band "Error: ..." results, which skip the self-check
+                                                conversation_history.append((expression, float(value)))
+
+                                                # Pure arithmetic is checked locally; otherwise the
+                                                # self-check is answered alongside the next turn
+                                                turns.append(f"\nUser: Result is {value}. Let's verify this step.")
+                                                if cheap_verify(expression, value):
+                                                    pending_self_check = ("YES", expression, value)
+                                                else:
+                                                    fused_check = (expression, value)
+                                                    turns.append(f" {FUSED_INSTRUCTION}")
+                                            else:
+                                                turns.append(await handle_tool_error(
                                                     session,
-                                                    str(e),
-                                                    f"self-check for calculation: {expression}"
-                                                )
+                                                    "No calculation result returned",
+                                                    f"calculate: {expression}"
+                                                ))
                                             
-                                            prompt += f"\nUser: Result is {value}. Let's verify this step."
-                                            conversation_history.append((expression, float(value)))
-                                        else:
-                                            prompt += await handle_tool_error(
+                                        except Exception as e:
+                                            turns.append(await handle_tool_error(
                                                 session,
-                                                "No calculation result returned",
+                                                str(e),
                                                 f"calculate: {expression}"
+                                            ))
+                                        
+                                    elif func_name == "verify":
+                                        try:
+                                            expression = args.get("expression", "")
+                                            expected = float(args.get("expected", 0))
+                                            pending, pending_self_check = pending_self_check, None
+                                            verify_result, self_check_message = await asyncio.gather(
+                                                cached_call_tool(session, "verify", {
+                                                    "expression": expression,
+                                                    "expected": expected
+                                                }),
+                                                resolve_self_check(session, pending)
                                             )
-                                            
-                                    except Exception as e:
-                                        prompt += await handle_tool_error(
-                                            session,
-                                            str(e),
-                                            f"calculate: {expression}"
-                                        )
+                                            turns.append(self_check_message)
                                         
-                                elif func_name == "verify":
-                                    try:
-                                        expression = args.get("expression", "")
-                                        expected = float(args.get("expected", 0))
-                                        verify_result = await session.call_tool("verify", arguments={
-                                            "expression": expression,
-                                            "expected": expected
-                                        })
+                                            if verify_result.content and verify_result.content[0].text.lower() == "false":
+                                                # Verification failed, trigger fallback
+                                                await session.call_tool("fallback_reasoning", arguments={
+                                                    "step_description": f"Verification failed for {expression} = {expected}"
+                                                })
                                         
-                                        if verify_result.content and verify_result.content[0].text.lower() == "false":
-                                            # Verification failed, trigger fallback
-                                            await session.call_tool("fallback_reasoning", arguments={
-                                                "step_description": f"Verification failed for {expression} = {expected}"
-                                            })
+                                            turns.append(f"\nUser: Verification completed. Next step?")
                                         
-                                        prompt += f"\nUser: Verification completed. Next step?"
-                                        
-                                    except Exception as e:
-                                        prompt += await handle_tool_error(
-                                            session,
-                                            str(e),
-                                            f"verify: {expression} = {expected}"
-                                        )
+                                        except Exception as e:
+                                            turns.append(await handle_tool_error(
+                                                session,
+                                                str(e),
+                                                f"verify: {expression} = {expected}"
+                                            ))
                                     
-                                elif func_name == "fallback_reasoning":
-                                    # Direct fallback call from LLM
-                                    try:
-                                        step_description = args.get("step_description", "")
-                                        await session.call_tool("fallback_reasoning", arguments={
-                                            "step_description": step_description
-                                        })
-                                        prompt += "\nUser: Fallback processed. Please proceed with an alternative approach."
-                                    except Exception as e:
-                                        console.print(f"[red]Error in fallback handling: {e}[/red]")
+                                    elif func_name == "fallback_reasoning":
+                                        # Direct fallback call from LLM
+                                        try:
+                                            step_description = args.get("step_description", "")
+                                            await session.call_tool("fallback_reasoning", arguments={
+                                                "step_description": step_description
+                                            })
+                                            turns.append("\nUser: Fallback processed. Please proceed with an alternative approach.")
+                                        except Exception as e:
+                                            console.print(f"[red]Error in fallback handling: {e}[/red]")
                                 
-                        except Exception as e:
-                            prompt += await handle_tool_error(
-                                session,
-                                str(e),
-                                "general tool execution"
-                            )
-
-                    elif result.startswith("FINAL_ANSWER:"):
-                        # Verify the final answer against the original problem
-                        if conversation_history:
-                            final_answer = float(result.split("[")[1].split("]")[0])
-                            await session.call_tool("verify", arguments={
-                                "expression": problem,
-                                "expected": final_answer
-                            })
-                        break
+                            except Exception as e:
+                                turns.append(await handle_tool_error(
+                                    session,
+                                    str(e),
+                                    "general tool execution"
+                                ))
+
+                        elif result.startswith("FINAL_ANSWER:"):
+                            # Verify the final answer against the original problem
+                            if conversation_history:
+                                final_answer = parse_final_answer(result)
+                                await cached_call_tool(session, "verify", {
+                                    "expression": problem,
+                                    "expected": final_answer
+                                })
+                            break
                     
-                    prompt += f"\nAssistant: {result}"
+                        turns.append(f"\nAssistant: {result}")
 
-                console.print("\n[green]Calculation completed![/green]")
+                    await resolve_self_check(session, pending_self_check)
+                    console.print("\n[green]Calculation completed![/green]")
+                finally:
+                    await delete_prompt_cache(client, prompt_cache)
 
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
+    finally:
+        close_prompt_cache()
 
 if __name__ == "__main__":
     asyncio.run(main())